@@ -4,56 +4,289 @@ Areeb Model Web - Cursor Tools Proxy for Qwen3
 """
 
 import os
-import sys
-import json
+import asyncio
+import contextlib
 import logging
-from flask import Flask, request, Response, jsonify
-import requests
+import multiprocessing
+import signal
+import httpx
+import orjson
+import uvicorn
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from utils.config_loader import ConfigLoader
-from utils.logger import setup_logging
+from utils.logger import setup_logging, setup_worker_logging
 from tools.file_operations import FileOperations
 from tools.terminal_operations import TerminalOperations
 from tools.search_operations import SearchOperations
 from tools.edit_operations import EditOperations
 
+# Connection-scoped headers that must not be relayed from upstream
+HOP_BY_HOP = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+    'content-encoding', 'content-length'
+})
+
+# Client request headers not forwarded upstream; the body is sent as
+# received, so its encoding header is kept. Accept-Encoding is left to
+# httpx, which then only asks for codecs it can decode before relaying.
+FORWARD_EXCLUDED = (HOP_BY_HOP - {'content-encoding'}) | {'host', 'authorization', 'accept-encoding'}
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Tools that can run for a long time or burn CPU, isolated in worker processes
+BLOCKING_TOOLS = frozenset({
+    'terminal_command', 'grep_search', 'search_files', 'codebase_search'
+})
+
+# Request fields dropped from the follow-up completion after tool execution
+FOLLOW_UP_EXCLUDED = frozenset({'tools', 'tool_choice'})
+
+def run_tool_job(conn, handler, args, log_level):
+    """Worker process entry point running one blocking tool call"""
+    # Log records and then the result go back over conn, which belongs to
+    # this job alone, so killing the process cannot break another job's.
+    # Its own process group lets commands it started be killed with it.
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    log_queue = setup_worker_logging(conn, log_level)
+    try:
+        result = handler(*args)
+    except Exception as e:
+        result = {
+            "success": False,
+            "error": f"Tool execution failed: {str(e)}"
+        }
+    log_queue.send(('result', result))
+    conn.close()
+
+def relay_headers(response):
+    """Upstream response headers that are safe to send back to the client"""
+    return {
+        k: v for k, v in response.headers.items()
+        if k.lower() not in HOP_BY_HOP
+    }
+
 class AreebModelProxy:
     def __init__(self, config_path="config.yaml"):
         self.config = ConfigLoader(config_path)
         self.logger = setup_logging(self.config)
         
+        # Settings read on the request path, resolved once since the
+        # config does not change at runtime
+        self._cfg = SimpleNamespace(
+            model_endpoint=self.config.get('model.endpoint'),
+            model_api_key=self.config.get('model.api_key'),
+            model_name=self.config.get('model.model_name'),
+            timeout=self.config.get('model.timeout', 300),
+            enable_file_ops=self.config.get('tools.enable_file_operations', True),
+            enable_terminal=self.config.get('tools.enable_terminal', True),
+            enable_edit_ops=self.config.get('tools.enable_edit_operations', True),
+            max_parallel_tools=self.config.get('tools.max_parallel', 8),
+            tool_timeout=self.config.get('tools.timeout', 120),
+            # Every server worker has its own job slots, so by default
+            # together they get one process per CPU
+            blocking_workers=self.config.get(
+                'tools.max_blocking_workers',
+                max(1, (os.cpu_count() or 1) // max(1, self.config.get('server.workers', 1)))
+            )
+        )
+        
         # Initialize tool handlers
         self.file_ops = FileOperations(self.config, self.logger)
         self.terminal_ops = TerminalOperations(self.config, self.logger)
         self.search_ops = SearchOperations(self.config, self.logger)
-        self.edit_ops = EditOperations(self.config, self.logger)
+        self.edit_ops = EditOperations(self.config, self.logger, file_ops=self.file_ops)
         
-        self.app = Flask(__name__)
+        # Tool name -> (handler, ((argument, default), ...))
+        self._tool_dispatch = {
+            # File operations
+            "read_file": (self.file_ops.read_file, (("file_path", None),)),
+            "list_directory": (
+                self.file_ops.list_directory,
+                (("directory_path", None), ("recursive", False))
+            ),
+            "delete_file": (self.file_ops.delete_file, (("file_path", None),)),
+            "create_file": (
+                self.file_ops.create_file,
+                (("file_path", None), ("content", None))
+            ),
+            # Edit operations
+            "edit_file": (
+                self.edit_ops.edit_file,
+                (("file_path", None), ("content", None),
+                 ("start_line", None), ("end_line", None))
+            ),
+            # Terminal operations
+            "terminal_command": (
+                self.terminal_ops.execute_command,
+                (("command", None), ("working_directory", "."))
+            ),
+            # Search operations
+            "search_files": (
+                self.search_ops.search_files,
+                (("pattern", None), ("directory", "."))
+            ),
+            "grep_search": (
+                self.search_ops.grep_search,
+                (("pattern", None), ("directory", "."), ("file_pattern", "*"))
+            ),
+            "codebase_search": (
+                self.search_ops.codebase_search,
+                (("query", None), ("file_types", []))
+            ),
+        }
+        
+        # Tool handlers block on disk and subprocess I/O, run them off the loop
+        self._tool_pool = ThreadPoolExecutor(
+            max_workers=self._cfg.max_parallel_tools,
+            thread_name_prefix='tool'
+        )
+        
+        # Commands and tree searches run in a process of their own each, so
+        # they neither hold the GIL nor tie up a tool thread, and one that
+        # overruns its timeout can be killed without touching the others.
+        # The fork server keeps starting those processes cheap.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self._mp_context = multiprocessing.get_context('forkserver')
+            self._mp_context.set_forkserver_preload([
+                'proxy_server', 'tools.search_operations', 'tools.terminal_operations'
+            ])
+        else:
+            self._mp_context = multiprocessing.get_context('spawn')
+        self._blocking_slots = asyncio.Semaphore(self._cfg.blocking_workers)
+        
+        # Tool definitions only depend on config, so build and encode them once
+        self._tools_list = self.get_available_tools()
+        self._tools_json_fragment = orjson.dumps(self._tools_list)
+        
+        # Upstream URLs and credentials are fixed for the process lifetime
+        self._model_base = (self._cfg.model_endpoint or '').rstrip('/')
+        self._chat_url = f"{self._model_base}/v1/chat/completions"
+        self._models_url = f"{self._model_base}/v1/models"
+        self._auth_header = f"Bearer {self._cfg.model_api_key}"
+        
+        # Shared async HTTP client for upstream model calls; the pooled
+        # transport keeps connections alive and retries failed connects
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=2),
+            headers={'Authorization': self._auth_header},
+            timeout=self._cfg.timeout
+        )
+        
+        # No docs or schema routes of its own, those paths go upstream too
+        self.app = FastAPI(
+            title="Areeb Model Web",
+            default_response_class=ORJSONResponse,
+            lifespan=self.lifespan,
+            docs_url=None,
+            redoc_url=None,
+            openapi_url=None
+        )
         self.setup_routes()
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app):
+        """Release upstream connections and tool workers on shutdown"""
+        yield
+        await self.client.aclose()
+        self._tool_pool.shutdown(wait=False)
+    
+    async def receive_job_result(self, conn):
+        """Wait for a tool job's result, passing on its log records meanwhile"""
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(conn.fileno(), readable.set)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                # Raises EOFError if the job process died before its result
+                while conn.poll():
+                    kind, payload = conn.recv()
+                    if kind == 'result':
+                        return payload
+                    self.logger.handle(payload)
+        finally:
+            loop.remove_reader(conn.fileno())
+    
+    async def run_in_job_process(self, handler, args):
+        """Run handler(*args) in a new process, killing it after the tool timeout"""
+        loop = asyncio.get_running_loop()
+        conn, child_conn = self._mp_context.Pipe(duplex=False)
+        process = self._mp_context.Process(
+            target=run_tool_job,
+            args=(child_conn, handler, args, self.logger.level),
+            daemon=True
+        )
+        try:
+            await loop.run_in_executor(self._tool_pool, process.start)
+            # Only the child may hold the write end, so its exit shows as EOF
+            child_conn.close()
+            return await asyncio.wait_for(
+                self.receive_job_result(conn), timeout=self._cfg.tool_timeout
+            )
+        finally:
+            conn.close()
+            child_conn.close()
+            if process.pid is not None:
+                if process.is_alive():
+                    if hasattr(os, 'killpg'):
+                        with contextlib.suppress(ProcessLookupError):
+                            os.killpg(process.pid, signal.SIGKILL)
+                    process.kill()
+                await loop.run_in_executor(self._tool_pool, process.join)
+    
+    async def send_streaming(self, method, url, **kwargs):
+        """Send an upstream request without buffering the response body"""
+        upstream_request = self.client.build_request(method, url, **kwargs)
+        return await self.client.send(upstream_request, stream=True)
+    
+    def encode_with_tools(self, data):
+        """Serialize a request body, splicing in the pre-encoded tool list"""
+        body = orjson.dumps(data)
+        if body == b'{}':
+            return b'{"tools":' + self._tools_json_fragment + b'}'
+        return body[:-1] + b',"tools":' + self._tools_json_fragment + b'}'
+    
+    def stream_response(self, response):
+        """Relay an upstream response to the client chunk by chunk"""
+        return StreamingResponse(
+            response.aiter_bytes(),
+            status_code=response.status_code,
+            headers=relay_headers(response),
+            background=BackgroundTask(response.aclose)
+        )
         
     def setup_routes(self):
-        """Setup Flask routes"""
+        """Setup FastAPI routes"""
         
-        @self.app.route('/v1/chat/completions', methods=['POST'])
-        def chat_completions():
-            return self.handle_chat_completion()
+        @self.app.post('/v1/chat/completions')
+        async def chat_completions(request: Request):
+            return await self.handle_chat_completion(request)
             
-        @self.app.route('/v1/models', methods=['GET'])
-        def list_models():
-            return self.handle_list_models()
+        @self.app.get('/v1/models')
+        async def list_models():
+            return await self.handle_list_models()
             
-        @self.app.route('/health', methods=['GET'])
-        def health_check():
-            return jsonify({"status": "healthy", "service": "areeb-model-web"})
+        @self.app.get('/health')
+        async def health_check():
+            return {"status": "healthy", "service": "areeb-model-web"}
             
-        @self.app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
-        def proxy_other(path):
-            return self.proxy_request(path)
+        @self.app.api_route('/{path:path}', methods=['GET', 'POST', 'PUT', 'DELETE'])
+        async def proxy_other(path: str, request: Request):
+            return await self.proxy_request(path, request)
 
     def get_available_tools(self):
         """Define all available tools for Cursor"""
         tools = []
         
-        if self.config.get('tools.enable_file_operations', True):
+        if self._cfg.enable_file_ops:
             tools.extend([
                 {
                     "type": "function",
@@ -113,7 +346,7 @@ class AreebModelProxy:
                 }
             ])
         
-        if self.config.get('tools.enable_terminal', True):
+        if self._cfg.enable_terminal:
             tools.append({
                 "type": "function",
                 "function": {
@@ -137,7 +370,7 @@ class AreebModelProxy:
                 }
             })
         
-        if self.config.get('tools.enable_edit_operations', True):
+        if self._cfg.enable_edit_ops:
             tools.extend([
                 {
                     "type": "function",
@@ -273,61 +506,15 @@ class AreebModelProxy:
         try:
             self.logger.info(f"Executing tool: {tool_name} with args: {arguments}")
             
-            # File operations
-            if tool_name == "read_file":
-                return self.file_ops.read_file(arguments.get("file_path"))
-            elif tool_name == "list_directory":
-                return self.file_ops.list_directory(
-                    arguments.get("directory_path"),
-                    arguments.get("recursive", False)
-                )
-            elif tool_name == "delete_file":
-                return self.file_ops.delete_file(arguments.get("file_path"))
-            elif tool_name == "create_file":
-                return self.file_ops.create_file(
-                    arguments.get("file_path"),
-                    arguments.get("content")
-                )
-            
-            # Edit operations
-            elif tool_name == "edit_file":
-                return self.edit_ops.edit_file(
-                    arguments.get("file_path"),
-                    arguments.get("content"),
-                    arguments.get("start_line"),
-                    arguments.get("end_line")
-                )
-            
-            # Terminal operations
-            elif tool_name == "terminal_command":
-                return self.terminal_ops.execute_command(
-                    arguments.get("command"),
-                    arguments.get("working_directory", ".")
-                )
-            
-            # Search operations
-            elif tool_name == "search_files":
-                return self.search_ops.search_files(
-                    arguments.get("pattern"),
-                    arguments.get("directory", ".")
-                )
-            elif tool_name == "grep_search":
-                return self.search_ops.grep_search(
-                    arguments.get("pattern"),
-                    arguments.get("directory", "."),
-                    arguments.get("file_pattern", "*")
-                )
-            elif tool_name == "codebase_search":
-                return self.search_ops.codebase_search(
-                    arguments.get("query"),
-                    arguments.get("file_types", [])
-                )
-            
-            else:
+            entry = self._tool_dispatch.get(tool_name)
+            if entry is None:
                 return {
                     "success": False,
                     "error": f"Unknown tool: {tool_name}"
                 }
+            
+            handler, argspec = entry
+            return handler(*[arguments.get(name, default) for name, default in argspec])
                 
         except Exception as e:
             self.logger.error(f"Error executing tool {tool_name}: {str(e)}")
@@ -336,37 +523,103 @@ class AreebModelProxy:
                 "error": f"Tool execution failed: {str(e)}"
             }
 
-    def handle_chat_completion(self):
+    async def execute_blocking_tool_call(self, tool_name, arguments):
+        """Execute a long-running tool in a worker process with a timeout"""
+        try:
+            self.logger.info(f"Executing tool: {tool_name} with args: {arguments}")
+            
+            handler, argspec = self._tool_dispatch[tool_name]
+            args = [arguments.get(name, default) for name, default in argspec]
+            async with self._blocking_slots:
+                return await self.run_in_job_process(handler, args)
+            
+        except asyncio.TimeoutError:
+            self.logger.error(f"Tool {tool_name} timed out after {self._cfg.tool_timeout} seconds")
+            return {
+                "success": False,
+                "error": f"Tool execution timed out after {self._cfg.tool_timeout} seconds"
+            }
+        except EOFError:
+            self.logger.error(f"Tool worker process died while running {tool_name}")
+            return {
+                "success": False,
+                "error": "Tool execution failed: worker process terminated unexpectedly"
+            }
+        except Exception as e:
+            self.logger.error(f"Error executing tool {tool_name}: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Tool execution failed: {str(e)}"
+            }
+
+    async def run_tool_call(self, tool_call):
+        """Run a model tool call on a worker pool and build its tool message"""
+        function = tool_call.get('function', {})
+        tool_name = function.get('name')
+        arguments = orjson.loads(function.get('arguments') or '{}')
+        
+        if tool_name in BLOCKING_TOOLS:
+            result = await self.execute_blocking_tool_call(tool_name, arguments)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._tool_pool, self.execute_tool_call, tool_name, arguments
+            )
+        return {
+            "tool_call_id": tool_call.get('id'),
+            "role": "tool",
+            "name": tool_name,
+            "content": orjson.dumps(result).decode()
+        }
+
+    async def handle_chat_completion(self, request):
         """Handle chat completion requests"""
         try:
-            data = request.get_json()
+            data = orjson.loads(await request.body())
+            
+            # Log the incoming request (full payload only at debug level)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Chat completion request: %s", orjson.dumps(data).decode())
             
-            # Log the incoming request
-            self.logger.info(f"Chat completion request: {json.dumps(data, indent=2)}")
+            # A client sending tool results runs its own tool loop, so the
+            # request is forwarded untouched (only the tail needs checking)
+            client_tool_loop = any(
+                m.get('role') == 'tool' for m in (data.get('messages') or [])[-5:]
+            )
+            
+            # Tool calls cannot be resolved mid-stream and are the client's
+            # job in its own loop; both are relayed as-is
+            relay_as_is = bool(data.get('stream')) or client_tool_loop
             
-            # Add tools if not present
-            if 'tools' not in data or not data['tools']:
-                data['tools'] = self.get_available_tools()
-                self.logger.info(f"Added {len(data['tools'])} tools to request")
+            # Add tools if not present, only when the proxy runs the calls
+            if not relay_as_is and ('tools' not in data or not data['tools']):
+                data.pop('tools', None)
+                body = self.encode_with_tools(data)
+                self.logger.info("Added %d tools to request", len(self._tools_list))
+            else:
+                body = orjson.dumps(data)
             
             # Forward to Qwen3 model
-            model_endpoint = f"{self.config.get('model.endpoint')}/v1/chat/completions"
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f"Bearer {self.config.get('model.api_key')}"
-            }
+            if relay_as_is:
+                response = await self.send_streaming(
+                    'POST',
+                    self._chat_url,
+                    content=body,
+                    headers=JSON_HEADERS
+                )
+                self.logger.info(f"Model response status: {response.status_code}")
+                return self.stream_response(response)
             
-            response = requests.post(
-                model_endpoint,
-                json=data,
-                headers=headers,
-                timeout=self.config.get('model.timeout', 300)
+            response = await self.client.post(
+                self._chat_url,
+                content=body,
+                headers=JSON_HEADERS
             )
             
             self.logger.info(f"Model response status: {response.status_code}")
             
             if response.status_code == 200:
-                response_data = response.json()
+                response_data = orjson.loads(response.content)
                 
                 # Check if model wants to call tools
                 if 'choices' in response_data and response_data['choices']:
@@ -374,116 +627,109 @@ class AreebModelProxy:
                     message = choice.get('message', {})
                     
                     if 'tool_calls' in message and message['tool_calls']:
-                        # Execute tool calls
-                        tool_results = []
-                        for tool_call in message['tool_calls']:
-                            function = tool_call.get('function', {})
-                            tool_name = function.get('name')
-                            arguments = json.loads(function.get('arguments', '{}'))
-                            
-                            result = self.execute_tool_call(tool_name, arguments)
-                            tool_results.append({
-                                "tool_call_id": tool_call.get('id'),
-                                "role": "tool",
-                                "name": tool_name,
-                                "content": json.dumps(result)
-                            })
+                        # Execute tool calls concurrently, results keep call order
+                        tool_results = await asyncio.gather(*[
+                            self.run_tool_call(tool_call)
+                            for tool_call in message['tool_calls']
+                        ])
                         
                         # Add tool results to conversation and get final response
                         data['messages'].append(message)
                         data['messages'].extend(tool_results)
                         
                         # Remove tools from follow-up request to avoid recursion
-                        follow_up_data = data.copy()
-                        follow_up_data.pop('tools', None)
+                        follow_up_data = {
+                            k: v for k, v in data.items()
+                            if k not in FOLLOW_UP_EXCLUDED
+                        }
                         
-                        final_response = requests.post(
-                            model_endpoint,
-                            json=follow_up_data,
-                            headers=headers,
-                            timeout=self.config.get('model.timeout', 300)
+                        final_response = await self.send_streaming(
+                            'POST',
+                            self._chat_url,
+                            content=orjson.dumps(follow_up_data),
+                            headers=JSON_HEADERS
                         )
                         
-                        return Response(
-                            final_response.content,
-                            final_response.status_code,
-                            final_response.headers.items()
-                        )
+                        return self.stream_response(final_response)
             
             return Response(
                 response.content,
                 response.status_code,
-                response.headers.items()
+                relay_headers(response)
             )
             
         except Exception as e:
             self.logger.error(f"Error in chat completion: {str(e)}")
-            return jsonify({
+            return ORJSONResponse({
                 "error": {
                     "message": f"Proxy error: {str(e)}",
                     "type": "proxy_error"
                 }
-            }), 500
+            }, status_code=500)
 
-    def handle_list_models(self):
+    async def handle_list_models(self):
         """Handle model listing requests"""
         try:
-            model_endpoint = f"{self.config.get('model.endpoint')}/v1/models"
-            headers = {
-                'Authorization': f"Bearer {self.config.get('model.api_key')}"
-            }
-            
-            response = requests.get(model_endpoint, headers=headers)
-            return Response(
-                response.content,
-                response.status_code,
-                response.headers.items()
-            )
+            response = await self.send_streaming('GET', self._models_url)
+            return self.stream_response(response)
         except Exception as e:
             self.logger.error(f"Error listing models: {str(e)}")
-            return jsonify({
+            return ORJSONResponse({
                 "object": "list",
                 "data": [{
-                    "id": self.config.get('model.model_name'),
+                    "id": self._cfg.model_name,
                     "object": "model",
                     "created": 1234567890,
                     "owned_by": "areeb-model-web"
                 }]
             })
 
-    def proxy_request(self, path):
+    async def proxy_request(self, path, request):
         """Proxy other requests to the model endpoint"""
         try:
-            url = f"{self.config.get('model.endpoint')}/{path}"
-            headers = dict(request.headers)
-            headers['Authorization'] = f"Bearer {self.config.get('model.api_key')}"
+            url = f"{self._model_base}/{path}"
+            headers = [
+                (k, v) for k, v in request.headers.items()
+                if k not in FORWARD_EXCLUDED
+            ]
+            headers.append(('Authorization', self._auth_header))
             
-            response = requests.request(
-                method=request.method,
-                url=url,
+            response = await self.send_streaming(
+                request.method,
+                url,
                 headers=headers,
-                data=request.get_data(),
-                params=request.args
+                content=await request.body(),
+                params=request.query_params
             )
             
-            return Response(
-                response.content,
-                response.status_code,
-                response.headers.items()
-            )
+            return self.stream_response(response)
         except Exception as e:
             self.logger.error(f"Error proxying request to {path}: {str(e)}")
-            return jsonify({"error": str(e)}), 500
+            return ORJSONResponse({"error": str(e)}, status_code=500)
 
-    def run(self):
-        """Start the proxy server"""
-        host = self.config.get('server.host', '0.0.0.0')
-        port = self.config.get('server.port', 8001)
-        debug = self.config.get('server.debug', False)
-        
-        self.logger.info(f"Starting Areeb Model Web proxy on {host}:{port}")
-        self.app.run(host=host, port=port, debug=debug)
+def create_app():
+    """Application factory used by the uvicorn worker processes"""
+    config_path = os.environ.get('AREEB_MODEL_WEB_CONFIG', 'config.yaml')
+    return AreebModelProxy(config_path).app
+
+def run(config_path="config.yaml"):
+    """Start the proxy server"""
+    # Only the server settings are needed here; each worker process builds
+    # its own proxy, clients and pools from the same config file
+    config = ConfigLoader(config_path)
+    os.environ['AREEB_MODEL_WEB_CONFIG'] = config.config_path
+    
+    uvicorn.run(
+        "proxy_server:create_app",
+        factory=True,
+        host=config.get('server.host', '0.0.0.0'),
+        port=config.get('server.port', 8001),
+        workers=config.get('server.workers', 1),
+        loop='uvloop',
+        http='httptools',
+        log_level='debug' if config.get('server.debug', False) else 'info',
+        access_log=False
+    )
 
 if __name__ == '__main__':
-    proxy = AreebModelProxy()
-    proxy.run() 
\ No newline at end of file
+    run()
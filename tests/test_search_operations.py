@@ -0,0 +1,83 @@
+"""
+Tests for file pattern handling in SearchOperations
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+
+from tools.search_operations import SearchOperations
+
+class _Config:
+    def get(self, key, default=None):
+        return default
+
+class _SearchTreeTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for rel_path in ("src/a.py", "src/b.txt", "lib/src/c.py", "lib/d.py", "tests/unit/e.py",
+                         "web/f.test.js", "web/g.js", "types/h.d.ts", "types/i.ts",
+                         ".env", "src/.env", ".git/.env", ".git/j.py"):
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("needle\n")
+        
+        self.search_ops = SearchOperations(_Config(), logging.getLogger(__name__))
+        # Exercise the Python walk, not ripgrep
+        self.search_ops._rg = None
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+
+class GrepFilePatternTest(_SearchTreeTest):
+    def _matched_files(self, file_pattern):
+        result = self.search_ops.grep_search("needle", self.root, file_pattern)
+        self.assertTrue(result["success"], result)
+        return sorted(m["file"] for m in result["matches"])
+    
+    def test_name_pattern(self):
+        self.assertEqual(
+            self._matched_files("*.py"),
+            ["lib/d.py", "lib/src/c.py", "src/a.py", "tests/unit/e.py"]
+        )
+    
+    def test_multi_dot_name_pattern(self):
+        self.assertEqual(self._matched_files("*.test.js"), ["web/f.test.js"])
+        self.assertEqual(self._matched_files("*.d.ts"), ["types/h.d.ts"])
+        self.assertEqual(self._matched_files("*.ts"), ["types/h.d.ts", "types/i.ts"])
+    
+    def test_path_pattern_matches_at_any_depth(self):
+        self.assertEqual(self._matched_files("src/*.py"), ["lib/src/c.py", "src/a.py"])
+    
+    def test_path_pattern_with_double_star(self):
+        self.assertEqual(self._matched_files("**/unit/*.py"), ["tests/unit/e.py"])
+        self.assertEqual(self._matched_files("tests/**/*.py"), ["tests/unit/e.py"])
+
+    def test_hidden_files_need_a_dot_pattern(self):
+        self.assertEqual(self._matched_files(".env"), [".env", "src/.env"])
+        self.assertEqual(self._matched_files(".*"), [".env", "src/.env"])
+        self.assertNotIn(".env", self._matched_files("*"))
+    
+    def test_hidden_directory_in_path_pattern(self):
+        self.assertEqual(self._matched_files(".git/*.py"), [".git/j.py"])
+
+class SearchFilesPatternTest(_SearchTreeTest):
+    def _found_paths(self, pattern):
+        result = self.search_ops.search_files(pattern, self.root)
+        self.assertTrue(result["success"], result)
+        return sorted(m["path"] for m in result["matches"])
+    
+    def test_substring(self):
+        self.assertEqual(self._found_paths("D.T"), ["types/h.d.ts"])
+    
+    def test_wildcard(self):
+        self.assertEqual(
+            self._found_paths("*.py"),
+            ["lib/d.py", "lib/src/c.py", "src/a.py", "tests/unit/e.py"]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
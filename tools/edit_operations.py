@@ -5,20 +5,20 @@ Edit operations for file modification
 import os
 import shutil
 from datetime import datetime
+from .file_operations import FileOperations
 
 class EditOperations:
-    def __init__(self, config, logger):
+    def __init__(self, config, logger, file_ops=None):
         self.config = config
         self.logger = logger
+        # Path security checks are shared with the file tools
+        self.file_ops = file_ops or FileOperations(config, logger)
         self.auto_apply = config.get('tools.auto_apply_edits', False)
         self.backup_dir = "backups"
 
     def _create_backup(self, file_path):
         """Create a backup of the file before editing"""
         try:
-            if not os.path.exists(file_path):
-                return True, None
-            
             # Create backup directory
             os.makedirs(self.backup_dir, exist_ok=True)
             
@@ -27,8 +27,13 @@ class EditOperations:
             backup_name = f"{os.path.basename(file_path)}.{timestamp}.backup"
             backup_path = os.path.join(self.backup_dir, backup_name)
             
-            # Copy file to backup
-            shutil.copy2(file_path, backup_path)
+            # Copy file to backup; edits rewrite the file in place, so the
+            # backup has to be a real copy. copy2 uses in-kernel copying.
+            try:
+                shutil.copy2(file_path, backup_path)
+            except FileNotFoundError:
+                # New file, nothing to back up
+                return True, None
             
             return True, backup_path
             
@@ -36,13 +41,21 @@ class EditOperations:
             self.logger.error(f"Error creating backup for {file_path}: {str(e)}")
             return False, str(e)
 
+    def _write_file(self, file_path, data):
+        """Write data over the file in place"""
+        # Truncating the existing inode keeps its owner, group, mode, ACLs
+        # and xattrs. Unbuffered: the payload goes straight to write(2),
+        # retrying on short writes, with no intermediate buffer copy.
+        with open(file_path, 'wb', buffering=0) as f:
+            view = memoryview(data)
+            while view:
+                view = view[f.write(view):]
+
     def edit_file(self, file_path, content, start_line=None, end_line=None):
         """Edit file with optional line range"""
         try:
             # Security check (reuse from file_operations)
-            from .file_operations import FileOperations
-            file_ops = FileOperations(self.config, self.logger)
-            allowed, message = file_ops._is_path_allowed(file_path)
+            allowed, message = self.file_ops.is_path_allowed(file_path)
             if not allowed:
                 return {"success": False, "error": message}
             
@@ -67,19 +80,14 @@ class EditOperations:
                         "error": f"Invalid line range: {start_line}-{end_line} (file has {len(lines)} lines)"
                     }
                 
-                # Replace lines
-                new_content_lines = content.split('\n')
-                if not content.endswith('\n'):
-                    new_content_lines = [line + '\n' for line in new_content_lines[:-1]] + [new_content_lines[-1]]
-                else:
-                    new_content_lines = [line + '\n' for line in new_content_lines]
+                # Replace lines (line endings are kept as given)
+                new_content_lines = content.splitlines(keepends=True)
                 
                 # Adjust for 0-based indexing
                 lines[start_line-1:end_line] = new_content_lines
                 
                 # Write back
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.writelines(lines)
+                self._write_file(file_path, ''.join(lines).encode('utf-8'))
                 
                 return {
                     "success": True,
@@ -93,19 +101,19 @@ class EditOperations:
                 # Full file replacement
                 # Create directory if it doesn't exist
                 directory = os.path.dirname(file_path)
-                if directory and not os.path.exists(directory):
+                if directory:
                     os.makedirs(directory, exist_ok=True)
                 
-                # Write new content
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                # Write new content (encoded once, reused for the size)
+                encoded = content.encode('utf-8')
+                self._write_file(file_path, encoded)
                 
                 return {
                     "success": True,
                     "message": f"File edited successfully: {file_path}",
                     "backup_path": backup_path,
-                    "size": len(content.encode('utf-8')),
-                    "lines": len(content.split('\n'))
+                    "size": len(encoded),
+                    "lines": content.count('\n') + 1
                 }
             
         except Exception as e:
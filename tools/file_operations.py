@@ -3,36 +3,59 @@ File operations tools for Cursor compatibility
 """
 
 import os
-import json
+import stat
 import mimetypes
-from pathlib import Path
+
+# Upper bound on remembered path checks before the cache starts over
+ALLOW_CACHE_SIZE = 4096
 
 class FileOperations:
     def __init__(self, config, logger):
         self.config = config
         self.logger = logger
         self.max_file_size = config.get('security.max_file_size_mb', 10) * 1024 * 1024
-        self.allowed_dirs = config.get('security.allowed_directories', [])
-        self.blocked_dirs = config.get('security.blocked_directories', [])
+        self.max_output_lines = config.get('security.max_output_lines', 1000)
+        self.invalidate()
+
+    def invalidate(self):
+        """Re-read directory rules from config and drop cached path checks"""
+        self.allowed_dirs = self.config.get('security.allowed_directories', [])
+        self.blocked_dirs = self.config.get('security.blocked_directories', [])
+        
+        # Absolute, separator-terminated prefixes so each check is a single
+        # str.startswith and '/foo' does not also match '/foobar'
+        self._blocked_prefixes = tuple(os.path.join(os.path.abspath(d), '') for d in self.blocked_dirs)
+        self._allowed_prefixes = tuple(os.path.join(os.path.abspath(d), '') for d in self.allowed_dirs)
+        
+        # Results of is_path_allowed keyed by absolute path
+        self._allow_cache = {}
 
-    def _is_path_allowed(self, file_path):
+    def is_path_allowed(self, file_path):
         """Check if file path is allowed based on security settings"""
-        abs_path = os.path.abspath(file_path)
+        # Only relative inputs need abspath, which calls getcwd()
+        if not os.path.isabs(file_path):
+            file_path = os.path.abspath(file_path)
+        
+        result = self._allow_cache.get(file_path)
+        if result is None:
+            if len(self._allow_cache) >= ALLOW_CACHE_SIZE:
+                self._allow_cache.clear()
+            result = self._allow_cache[file_path] = self._check_path(file_path)
+        return result
+
+    def _check_path(self, abs_path):
+        """Check an absolute path against the blocked and allowed directories"""
+        abs_path = os.path.join(os.path.normpath(abs_path), '')
         
         # Check blocked directories
-        for blocked_dir in self.blocked_dirs:
-            if abs_path.startswith(os.path.abspath(blocked_dir)):
-                return False, f"Access denied: {blocked_dir} is blocked"
+        if abs_path.startswith(self._blocked_prefixes):
+            for blocked_dir, prefix in zip(self.blocked_dirs, self._blocked_prefixes):
+                if abs_path.startswith(prefix):
+                    return False, f"Access denied: {blocked_dir} is blocked"
         
         # Check allowed directories
-        if self.allowed_dirs:
-            allowed = False
-            for allowed_dir in self.allowed_dirs:
-                if abs_path.startswith(os.path.abspath(allowed_dir)):
-                    allowed = True
-                    break
-            if not allowed:
-                return False, "Access denied: Path not in allowed directories"
+        if self._allowed_prefixes and not abs_path.startswith(self._allowed_prefixes):
+            return False, "Access denied: Path not in allowed directories"
         
         return True, "OK"
 
@@ -40,40 +63,51 @@ class FileOperations:
         """Read file contents with security checks"""
         try:
             # Security check
-            allowed, message = self._is_path_allowed(file_path)
+            allowed, message = self.is_path_allowed(file_path)
             if not allowed:
                 return {"success": False, "error": message}
             
-            if not os.path.exists(file_path):
+            # Open first and inspect the descriptor, so a single fstat covers
+            # existence, type and size and the file cannot change in between.
+            # O_NONBLOCK keeps a FIFO from blocking the open.
+            try:
+                fd = os.open(file_path, os.O_RDONLY | os.O_CLOEXEC | os.O_NONBLOCK)
+            except FileNotFoundError:
                 return {"success": False, "error": f"File not found: {file_path}"}
             
-            if not os.path.isfile(file_path):
-                return {"success": False, "error": f"Path is not a file: {file_path}"}
-            
-            # Check file size
-            file_size = os.path.getsize(file_path)
-            if file_size > self.max_file_size:
-                return {
-                    "success": False, 
-                    "error": f"File too large: {file_size} bytes (max: {self.max_file_size})"
-                }
-            
-            # Determine if file is binary
-            mime_type, _ = mimetypes.guess_type(file_path)
-            is_binary = mime_type and not mime_type.startswith('text/')
-            
-            if is_binary:
-                return {
-                    "success": False,
-                    "error": f"Cannot read binary file: {file_path} (type: {mime_type})"
-                }
-            
-            # Read file
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            try:
+                file_stat = os.fstat(fd)
+                if not stat.S_ISREG(file_stat.st_mode):
+                    return {"success": False, "error": f"Path is not a file: {file_path}"}
+                
+                # Check file size
+                file_size = file_stat.st_size
+                if file_size > self.max_file_size:
+                    return {
+                        "success": False, 
+                        "error": f"File too large: {file_size} bytes (max: {self.max_file_size})"
+                    }
+                
+                # Determine if file is binary
+                mime_type, _ = mimetypes.guess_type(file_path)
+                is_binary = mime_type and not mime_type.startswith('text/')
+                
+                if is_binary:
+                    return {
+                        "success": False,
+                        "error": f"Cannot read binary file: {file_path} (type: {mime_type})"
+                    }
+                
+                # Read file through the descriptor we already hold
+                with os.fdopen(fd, 'r', encoding='utf-8', errors='ignore') as f:
+                    fd = None
+                    content = f.read()
+            finally:
+                if fd is not None:
+                    os.close(fd)
             
             # Limit output lines
-            max_lines = self.config.get('security.max_output_lines', 1000)
+            max_lines = self.max_output_lines
             lines = content.split('\n')
             if len(lines) > max_lines:
                 content = '\n'.join(lines[:max_lines])
@@ -91,11 +125,23 @@ class FileOperations:
             self.logger.error(f"Error reading file {file_path}: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def _describe_entry(self, entry, rel_path):
+        """Build a directory listing item from a DirEntry"""
+        entry_stat = entry.stat()
+        is_dir = entry.is_dir()
+        return {
+            "name": entry.name,
+            "path": rel_path,
+            "type": "directory" if is_dir else "file",
+            "size": entry_stat.st_size if entry.is_file() else None,
+            "modified": entry_stat.st_mtime
+        }
+
     def list_directory(self, directory_path, recursive=False):
         """List directory contents"""
         try:
             # Security check
-            allowed, message = self._is_path_allowed(directory_path)
+            allowed, message = self.is_path_allowed(directory_path)
             if not allowed:
                 return {"success": False, "error": message}
             
@@ -106,46 +152,48 @@ class FileOperations:
                 return {"success": False, "error": f"Path is not a directory: {directory_path}"}
             
             items = []
+            # Walk from an absolute root so per-entry checks skip getcwd()
+            abs_directory = os.path.abspath(directory_path)
             
             if recursive:
-                for root, dirs, files in os.walk(directory_path):
-                    # Filter out blocked directories
-                    dirs[:] = [d for d in dirs if self._is_path_allowed(os.path.join(root, d))[0]]
+                # Iterative scandir walk; entry types come from the directory
+                # listing itself, so only the stat for size/mtime hits the disk.
+                # Each directory carries its relative prefix, so relative
+                # paths are a concatenation rather than a relpath call.
+                pending = [(abs_directory, '')]
+                while pending:
+                    dir_path, rel_prefix = pending.pop()
+                    try:
+                        entries = os.scandir(dir_path)
+                    except OSError:
+                        continue
                     
-                    for name in dirs + files:
-                        full_path = os.path.join(root, name)
-                        rel_path = os.path.relpath(full_path, directory_path)
+                    with entries:
+                        for entry in entries:
+                            rel_path = rel_prefix + entry.name
+                            if entry.is_dir():
+                                # Filter out blocked directories
+                                if not self.is_path_allowed(entry.path)[0]:
+                                    continue
+                                # Like os.walk, do not descend into symlinks
+                                if entry.is_dir(follow_symlinks=False):
+                                    pending.append((entry.path, rel_path + os.sep))
+                            
+                            try:
+                                items.append(self._describe_entry(entry, rel_path))
+                            except (OSError, IOError):
+                                continue
+            else:
+                with os.scandir(abs_directory) as entries:
+                    for entry in entries:
+                        # Security check for each item
+                        if not self.is_path_allowed(entry.path)[0]:
+                            continue
                         
                         try:
-                            stat = os.stat(full_path)
-                            items.append({
-                                "name": name,
-                                "path": rel_path,
-                                "type": "directory" if os.path.isdir(full_path) else "file",
-                                "size": stat.st_size if os.path.isfile(full_path) else None,
-                                "modified": stat.st_mtime
-                            })
+                            items.append(self._describe_entry(entry, entry.name))
                         except (OSError, IOError):
                             continue
-            else:
-                for item in os.listdir(directory_path):
-                    item_path = os.path.join(directory_path, item)
-                    
-                    # Security check for each item
-                    if not self._is_path_allowed(item_path)[0]:
-                        continue
-                    
-                    try:
-                        stat = os.stat(item_path)
-                        items.append({
-                            "name": item,
-                            "path": item,
-                            "type": "directory" if os.path.isdir(item_path) else "file",
-                            "size": stat.st_size if os.path.isfile(item_path) else None,
-                            "modified": stat.st_mtime
-                        })
-                    except (OSError, IOError):
-                        continue
             
             return {
                 "success": True,
@@ -162,7 +210,7 @@ class FileOperations:
         """Delete a file with security checks"""
         try:
             # Security check
-            allowed, message = self._is_path_allowed(file_path)
+            allowed, message = self.is_path_allowed(file_path)
             if not allowed:
                 return {"success": False, "error": message}
             
@@ -187,27 +235,33 @@ class FileOperations:
         """Create a new file with content"""
         try:
             # Security check
-            allowed, message = self._is_path_allowed(file_path)
+            allowed, message = self.is_path_allowed(file_path)
             if not allowed:
                 return {"success": False, "error": message}
             
             # Create directory if it doesn't exist
             directory = os.path.dirname(file_path)
-            if directory and not os.path.exists(directory):
+            if directory:
                 os.makedirs(directory, exist_ok=True)
             
-            # Check if file already exists
-            if os.path.exists(file_path):
+            # Exclusive create, so checking for an existing file and
+            # creating it cannot race
+            try:
+                f = open(file_path, 'x', encoding='utf-8')
+            except FileExistsError:
                 return {"success": False, "error": f"File already exists: {file_path}"}
             
-            # Write content
-            with open(file_path, 'w', encoding='utf-8') as f:
+            # Write content; the size comes from the written file rather
+            # than encoding the content a second time
+            with f:
                 f.write(content)
+                f.flush()
+                size = os.fstat(f.fileno()).st_size
             
             return {
                 "success": True,
                 "message": f"File created successfully: {file_path}",
-                "size": len(content.encode('utf-8'))
+                "size": size
             }
             
         except Exception as e:
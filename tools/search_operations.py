@@ -2,11 +2,192 @@
 Search operations for file and content searching
 """
 
+import io
 import os
-import glob
 import re
+import stat
+import base64
+import fnmatch
+import shutil
 import subprocess
-from pathlib import Path
+import functools
+import orjson
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads reading and scanning files for a Python grep, and how many
+# files each may have queued ahead of the one being collected
+GREP_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+GREP_QUEUE_PER_WORKER = 4
+
+# Files up to this size are read and searched whole; larger ones are
+# streamed line by line so memory stays bounded across all grep threads
+GREP_WHOLE_FILE_BYTES = 1024 * 1024
+
+# Pattern syntax that can match a newline or anchor to the ends of the
+# input; whole-text searches could miss per-line matches for these
+_NEWLINE_SENSITIVE = re.compile(r'\\[sSWDnrAZxuUN0-7]|\[\^|\(\?[a-zA-Z]*s|\n')
+
+@functools.lru_cache(maxsize=128)
+def _compile_pattern(pattern, flags=0):
+    """Compile a case-insensitive search regex once per pattern"""
+    return re.compile(pattern, re.IGNORECASE | flags)
+
+def _matching_lines(compiled_pattern, line_finder, text):
+    """Yield (line_number, line) for each line of text matching compiled_pattern"""
+    if line_finder is None:
+        start = 0
+        line_num = 1
+        while start < len(text):
+            stop = text.find('\n', start)
+            end = len(text) if stop == -1 else stop + 1
+            line = text[start:end]
+            if compiled_pattern.search(line):
+                yield line_num, line
+            line_num += 1
+            start = end
+        return
+    
+    # line_finder is the same pattern in MULTILINE mode; searching the whole
+    # text with it jumps straight to candidate lines instead of running the
+    # regex once per line. A candidate is confirmed against its own line,
+    # since a match in the full text may run on across a newline.
+    pos = 0
+    line_num = 1
+    counted = 0
+    while pos < len(text):
+        m = line_finder.search(text, pos)
+        if m is None:
+            return
+        
+        start = text.rfind('\n', 0, m.start()) + 1
+        if start == len(text):
+            # Empty match after the final newline, which ends the last line
+            return
+        stop = text.find('\n', m.start())
+        end = len(text) if stop == -1 else stop + 1
+        
+        line_num += text.count('\n', counted, start)
+        counted = start
+        line = text[start:end]
+        if compiled_pattern.search(line):
+            yield line_num, line
+        pos = end
+
+@functools.lru_cache(maxsize=None)
+def _find_executable(name):
+    """Look up an executable on PATH once per process"""
+    return shutil.which(name)
+
+def _rg_bytes(field):
+    """Raw bytes of a ripgrep JSON field, sent as text or base64 bytes"""
+    if 'text' in field:
+        return field['text'].encode('utf-8')
+    return base64.b64decode(field['bytes'])
+
+def _in_linked_dir(dir_path, root, cache):
+    """Whether dir_path, below root, is reached through a symlinked directory"""
+    if len(dir_path) <= len(root):
+        return False
+    linked = cache.get(dir_path)
+    if linked is None:
+        linked = os.path.islink(dir_path) or _in_linked_dir(os.path.dirname(dir_path), root, cache)
+        cache[dir_path] = linked
+    return linked
+
+def _iter_matches(root, name_predicate, hidden_predicate=None, hidden_dirs=False):
+    """Yield DirEntry objects for regular files under root whose name matches"""
+    # Each directory's files come before its subdirectories, which are then
+    # walked depth-first in listing order, the same order glob's '**' gives.
+    # Like glob, hidden names are skipped unless asked for: hidden files
+    # only go to hidden_predicate, and hidden directories are only entered
+    # with hidden_dirs. Symlinked files are included, but symlinked
+    # directories are not descended into, which keeps link cycles out of
+    # the walk.
+    pending = [root]
+    while pending:
+        subdirs = []
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    hidden = entry.name.startswith('.')
+                    if hidden and hidden_predicate is None and not hidden_dirs:
+                        continue
+                    
+                    try:
+                        if entry.is_file():
+                            predicate = hidden_predicate if hidden else name_predicate
+                            if predicate is not None and predicate(entry.name):
+                                yield entry
+                        elif entry.is_dir(follow_symlinks=False):
+                            if not hidden or hidden_dirs:
+                                subdirs.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        
+        pending.extend(reversed(subdirs))
+
+def _match_path_parts(pattern_parts, path_parts):
+    """Whether path segments match glob segments, '**' standing for any number"""
+    # As in glob, '**' and wildcards only match hidden names when the
+    # glob segment itself starts with a dot
+    if not pattern_parts:
+        return not path_parts
+    if pattern_parts[0] == '**':
+        return any(
+            _match_path_parts(pattern_parts[1:], path_parts[i:])
+            for i in range(len(path_parts) + 1)
+            if not any(part.startswith('.') for part in path_parts[:i])
+        )
+    return (
+        bool(path_parts)
+        and (pattern_parts[0].startswith('.') or not path_parts[0].startswith('.'))
+        and fnmatch.fnmatchcase(path_parts[0], pattern_parts[0])
+        and _match_path_parts(pattern_parts[1:], path_parts[1:])
+    )
+
+def _name_predicate(file_types):
+    """Match a file name against any of the file type globs, or None if empty"""
+    if not file_types:
+        return None
+    
+    # Plain '*.ext' globs, '*.d.ts' included, reduce to a suffix check
+    if all(t.startswith('*.') and not any(c in t[1:] for c in '*?[') for t in file_types):
+        suffixes = tuple(t[1:] for t in file_types)
+        return lambda name: name.endswith(suffixes)
+    
+    return re.compile('|'.join(fnmatch.translate(t) for t in file_types)).match
+
+def _iter_source_files(root, file_types):
+    """Yield DirEntry objects for files under root matching any file type glob"""
+    name_types = [t for t in file_types if os.sep not in t]
+    path_types = [t for t in file_types if os.sep in t]
+    # Only globs starting with a dot match hidden names, as in glob
+    hidden_types = [t for t in name_types if t.startswith('.')]
+    if not path_types:
+        return _iter_matches(root, _name_predicate(name_types), _name_predicate(hidden_types))
+    
+    # Globs with a separator match the path below root, and like the
+    # root/**/pattern globs used before, they may start at any depth.
+    # Their last segment still filters names during the walk.
+    path_globs = [['**'] + t.strip(os.sep).split(os.sep) for t in path_types]
+    name_matches = _name_predicate(name_types) or (lambda name: False)
+    last_parts = [parts[-1] for parts in path_globs]
+    candidates = _iter_matches(
+        root,
+        _name_predicate(name_types + last_parts),
+        _name_predicate(hidden_types + [p for p in last_parts if p.startswith('.')]),
+        hidden_dirs=any(p.startswith('.') for parts in path_globs for p in parts[:-1])
+    )
+    return (
+        entry for entry in candidates
+        if name_matches(entry.name) or any(
+            _match_path_parts(parts, os.path.relpath(entry.path, root).split(os.sep))
+            for parts in path_globs
+        )
+    )
 
 class SearchOperations:
     def __init__(self, config, logger):
@@ -14,6 +195,7 @@ class SearchOperations:
         self.logger = logger
         self.max_results = 100
         self.max_output_lines = config.get('security.max_output_lines', 1000)
+        self._rg = _find_executable('rg')
 
     def search_files(self, pattern, directory="."):
         """Search for files by name using fuzzy matching"""
@@ -22,22 +204,25 @@ class SearchOperations:
                 return {"success": False, "error": f"Directory not found: {directory}"}
             
             matches = []
-            search_pattern = f"**/*{pattern}*"
+            needle = pattern.lower()
+            if any(c in needle for c in '*?['):
+                # Wildcards keep working as in the old '**/*{pattern}*' glob
+                wildcard = re.compile(fnmatch.translate(f"*{needle}*")).match
+                name_matches = lambda name: wildcard(name.lower())
+            else:
+                name_matches = lambda name: needle in name.lower()
             
-            # Use glob for pattern matching
-            for file_path in glob.glob(search_pattern, root_dir=directory, recursive=True):
-                full_path = os.path.join(directory, file_path)
-                if os.path.isfile(full_path):
-                    try:
-                        stat = os.stat(full_path)
-                        matches.append({
-                            "path": file_path,
-                            "full_path": full_path,
-                            "size": stat.st_size,
-                            "modified": stat.st_mtime
-                        })
-                    except (OSError, IOError):
-                        continue
+            for entry in _iter_matches(directory, name_matches):
+                try:
+                    file_stat = entry.stat()
+                    matches.append({
+                        "path": os.path.relpath(entry.path, directory),
+                        "full_path": entry.path,
+                        "size": file_stat.st_size,
+                        "modified": file_stat.st_mtime
+                    })
+                except (OSError, IOError):
+                    continue
                 
                 if len(matches) >= self.max_results:
                     break
@@ -62,54 +247,185 @@ class SearchOperations:
             self.logger.error(f"Error searching files with pattern '{pattern}': {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def grep_search(self, pattern, directory=".", file_pattern="*"):
-        """Search for patterns within files using grep-like functionality"""
+    def _ripgrep_search(self, pattern, directory, file_pattern):
+        """Collect grep matches using ripgrep, or None if it cannot run the search"""
+        matches = []
+        linked_dirs = {}
+        # ripgrep anchors globs containing a slash to the search root, the
+        # Python walk matches them at any depth
+        rg_glob = file_pattern
+        if '/' in file_pattern and not file_pattern.startswith('**/'):
+            rg_glob = '**/' + file_pattern.lstrip('/')
+        # Leave out hidden entries like the Python walk does; an explicit
+        # -g would otherwise bring them back in. Globs naming hidden files
+        # or directories themselves still reach them, as in glob.
+        glob_parts = file_pattern.strip('/').split('/')
+        if any(part.startswith('.') for part in glob_parts):
+            hidden_args = ['--hidden']
+            if not any(part.startswith('.') for part in glob_parts[:-1]):
+                hidden_args += ['-g', '!.*/']
+        else:
+            hidden_args = ['-g', '!.*']
+        process = subprocess.Popen(
+            # --follow is needed for symlinked files, matches found through
+            # symlinked directories are dropped below
+            [self._rg, '--json', '-i', '--follow', '--max-count', str(self.max_output_lines),
+             '-g', rg_glob, *hidden_args, '-e', pattern, '--', directory],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        
         try:
-            if not os.path.exists(directory):
-                return {"success": False, "error": f"Directory not found: {directory}"}
-            
-            matches = []
-            compiled_pattern = re.compile(pattern, re.IGNORECASE)
-            
-            # Find files matching the file pattern
-            search_files = glob.glob(
-                os.path.join(directory, "**", file_pattern), 
-                recursive=True
-            )
-            
-            for file_path in search_files:
-                if not os.path.isfile(file_path):
+            for raw_event in process.stdout:
+                event = orjson.loads(raw_event)
+                if event["type"] != "match":
                     continue
                 
-                try:
-                    # Skip binary files
-                    with open(file_path, 'rb') as f:
-                        chunk = f.read(1024)
-                        if b'\0' in chunk:
-                            continue
-                    
-                    # Search in file
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if compiled_pattern.search(line):
-                                matches.append({
-                                    "file": os.path.relpath(file_path, directory),
-                                    "line_number": line_num,
-                                    "line_content": line.strip(),
-                                    "match_positions": [
-                                        (m.start(), m.end()) 
-                                        for m in compiled_pattern.finditer(line)
-                                    ]
-                                })
-                                
-                                if len(matches) >= self.max_output_lines:
-                                    break
-                    
-                except (UnicodeDecodeError, IOError):
+                data = event["data"]
+                file_path = os.fsdecode(_rg_bytes(data["path"]))
+                if _in_linked_dir(os.path.dirname(file_path), directory, linked_dirs):
                     continue
                 
+                line_bytes = _rg_bytes(data["lines"])
+                line = line_bytes.decode('utf-8', errors='ignore')
+                matches.append({
+                    "file": os.path.relpath(file_path, directory),
+                    "line_number": data["line_number"],
+                    "line_content": line.strip(),
+                    # ripgrep reports byte offsets, positions are in characters
+                    "match_positions": [
+                        (
+                            len(line_bytes[:sub["start"]].decode('utf-8', errors='ignore')),
+                            len(line_bytes[:sub["end"]].decode('utf-8', errors='ignore'))
+                        )
+                        for sub in data["submatches"]
+                    ]
+                })
+                
                 if len(matches) >= self.max_output_lines:
+                    process.kill()
                     break
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        
+        # Exit code 2 without output means ripgrep rejected the pattern
+        # (its regex syntax differs from re) or could not search at all
+        if returncode == 2 and not matches:
+            return None
+        return matches
+
+    def _grep_one_file(self, file_path, directory, compiled_pattern, line_finder):
+        """Return grep matches for one file, up to max_output_lines"""
+        try:
+            fd = os.open(file_path, os.O_RDONLY | os.O_CLOEXEC | os.O_NONBLOCK)
+        except OSError:
+            return []
+        
+        try:
+            with os.fdopen(fd, 'rb') as f:
+                file_stat = os.fstat(fd)
+                if not stat.S_ISREG(file_stat.st_mode):
+                    return []
+                # Skip binary files
+                if b'\0' in os.pread(fd, 1024, 0):
+                    return []
+                
+                if file_stat.st_size > GREP_WHOLE_FILE_BYTES:
+                    with io.TextIOWrapper(f, encoding='utf-8', errors='ignore') as text_file:
+                        lines = (
+                            (line_num, line)
+                            for line_num, line in enumerate(text_file, 1)
+                            if compiled_pattern.search(line)
+                        )
+                        return self._collect_matches(file_path, directory, compiled_pattern, lines)
+                
+                # A plain read releases the GIL while waiting on the disk,
+                # which lets the other grep threads keep scanning
+                text = f.read().decode('utf-8', errors='ignore')
+        except OSError:
+            return []
+        
+        # Same newline handling as reading the file in text mode
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        
+        lines = _matching_lines(compiled_pattern, line_finder, text)
+        return self._collect_matches(file_path, directory, compiled_pattern, lines)
+
+    def _collect_matches(self, file_path, directory, compiled_pattern, lines):
+        """Build match dicts from (line_number, line) pairs, up to max_output_lines"""
+        matches = []
+        rel_path = os.path.relpath(file_path, directory)
+        for line_num, line in lines:
+            matches.append({
+                "file": rel_path,
+                "line_number": line_num,
+                "line_content": line.strip(),
+                "match_positions": [
+                    (m.start(), m.end()) 
+                    for m in compiled_pattern.finditer(line)
+                ]
+            })
+            
+            if len(matches) >= self.max_output_lines:
+                break
+        
+        return matches
+
+    def _scan_files(self, pattern, file_paths, directory):
+        """Collect matching lines from text files, up to max_output_lines"""
+        matches = []
+        compiled_pattern = _compile_pattern(pattern)
+        line_finder = None
+        if not _NEWLINE_SENSITIVE.search(pattern):
+            line_finder = _compile_pattern(pattern, re.MULTILINE)
+        
+        # Files are scanned on a thread pool, but only a bounded window is
+        # in flight and results are taken in submission order, so output
+        # order matches a serial scan and the walk stops once enough is found
+        executor = ThreadPoolExecutor(max_workers=GREP_WORKERS)
+        pending = deque()
+        file_paths = iter(file_paths)
+        try:
+            while True:
+                while len(pending) < GREP_WORKERS * GREP_QUEUE_PER_WORKER:
+                    file_path = next(file_paths, None)
+                    if file_path is None:
+                        break
+                    pending.append(executor.submit(
+                        self._grep_one_file, file_path, directory, compiled_pattern, line_finder
+                    ))
+                
+                if not pending:
+                    break
+                
+                matches.extend(pending.popleft().result())
+                if len(matches) >= self.max_output_lines:
+                    del matches[self.max_output_lines:]
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        return matches
+
+    def grep_search(self, pattern, directory=".", file_pattern="*"):
+        """Search for patterns within files using grep-like functionality"""
+        try:
+            if not os.path.exists(directory):
+                return {"success": False, "error": f"Directory not found: {directory}"}
+            
+            # Prefer ripgrep when installed, it falls back here on patterns
+            # it cannot handle
+            matches = None
+            if self._rg:
+                matches = self._ripgrep_search(pattern, directory, file_pattern)
+            if matches is None:
+                # Find files matching the file pattern
+                file_paths = (
+                    entry.path for entry in _iter_source_files(directory, [file_pattern])
+                )
+                matches = self._scan_files(pattern, file_paths, directory)
             
             return {
                 "success": True,
@@ -134,22 +450,10 @@ class SearchOperations:
             if file_types is None:
                 file_types = ["*.py", "*.js", "*.ts", "*.java", "*.cpp", "*.c", "*.h"]
             
-            all_matches = []
-            
-            # Search in each file type
-            for file_type in file_types:
-                matches = self.grep_search(query, ".", file_type)
-                if matches["success"]:
-                    all_matches.extend(matches["matches"])
-            
-            # Remove duplicates and sort by relevance
-            seen = set()
-            unique_matches = []
-            for match in all_matches:
-                key = (match["file"], match["line_number"])
-                if key not in seen:
-                    seen.add(key)
-                    unique_matches.append(match)
+            # One walk covers every file type, so each file is scanned once
+            # and no (file, line) pair can be reported twice
+            file_paths = (entry.path for entry in _iter_source_files(".", file_types))
+            unique_matches = self._scan_files(query, file_paths, ".")
             
             # Sort by file name and line number
             unique_matches.sort(key=lambda x: (x["file"], x["line_number"]))
@@ -184,30 +488,42 @@ class SearchOperations:
                 f"var {symbol}",      # JavaScript var
             ]
             
-            all_matches = []
+            # All patterns are matched in a single pass over each file
+            combined = _compile_pattern('|'.join(f"(?:{p})" for p in patterns))
             
-            for pattern in patterns:
-                for file_type in file_types:
-                    matches = self.grep_search(pattern, ".", file_type)
-                    if matches["success"]:
-                        all_matches.extend(matches["matches"])
+            matches = []
             
-            # Remove duplicates
-            seen = set()
-            unique_matches = []
-            for match in all_matches:
-                key = (match["file"], match["line_number"])
-                if key not in seen:
-                    seen.add(key)
-                    unique_matches.append(match)
+            for entry in _iter_source_files(".", file_types):
+                try:
+                    with open(entry.path, 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                
+                # Skip binary files
+                if b'\0' in data[:1024]:
+                    continue
+                
+                text = data.decode('utf-8', errors='ignore')
+                for line_num, line in enumerate(text.split('\n'), 1):
+                    if combined.search(line):
+                        matches.append({
+                            "file": os.path.relpath(entry.path, "."),
+                            "line_number": line_num,
+                            "line_content": line.strip(),
+                            "match_positions": [
+                                (m.start(), m.end()) 
+                                for m in combined.finditer(line)
+                            ]
+                        })
             
             return {
                 "success": True,
                 "symbol": symbol,
-                "matches": unique_matches,
-                "total_found": len(unique_matches)
+                "matches": matches,
+                "total_found": len(matches)
             }
             
         except Exception as e:
             self.logger.error(f"Error finding definition for '{symbol}': {str(e)}")
-            return {"success": False, "error": str(e)} 
\ No newline at end of file
+            return {"success": False, "error": str(e)} 
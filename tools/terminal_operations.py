@@ -4,9 +4,8 @@ Terminal operations for command execution
 
 import subprocess
 import os
-import shlex
+import re
 import psutil
-from threading import Timer
 
 class TerminalOperations:
     def __init__(self, config, logger):
@@ -15,26 +14,51 @@ class TerminalOperations:
         self.allowed_commands = config.get('security.allowed_commands', [])
         self.blocked_commands = config.get('security.blocked_commands', [])
         self.max_output_lines = config.get('security.max_output_lines', 1000)
+        
+        # Lowercased once here so each check is a single regex scan and a
+        # set lookup; blocked entries map back to their configured spelling
+        self._blocked_lower = {}
+        for blocked in self.blocked_commands:
+            self._blocked_lower.setdefault(blocked.lower(), blocked)
+        self._blocked_re = None
+        if self._blocked_lower:
+            self._blocked_re = re.compile('|'.join(re.escape(b) for b in self._blocked_lower))
+        self._allowed_lower = frozenset(cmd.lower() for cmd in self.allowed_commands)
 
     def _is_command_allowed(self, command):
         """Check if command is allowed based on security settings"""
         command_lower = command.lower().strip()
         
         # Check blocked commands
-        for blocked in self.blocked_commands:
-            if blocked.lower() in command_lower:
+        if self._blocked_re:
+            match = self._blocked_re.search(command_lower)
+            if match:
+                blocked = self._blocked_lower[match.group()]
                 return False, f"Command blocked: contains '{blocked}'"
         
         # Check allowed commands
-        if self.allowed_commands:
-            command_parts = shlex.split(command_lower)
+        if self._allowed_lower:
+            command_parts = command_lower.split(None, 1)
             if command_parts:
                 base_command = command_parts[0]
-                if base_command not in [cmd.lower() for cmd in self.allowed_commands]:
+                if base_command not in self._allowed_lower:
                     return False, f"Command not allowed: '{base_command}'"
         
         return True, "OK"
 
+    def _truncate_output(self, output):
+        """Limit output to max_output_lines, returning it with its line count"""
+        line_count = output.count('\n') + 1
+        if line_count > self.max_output_lines:
+            # Find where the last kept line ends instead of splitting the
+            # whole buffer into lines and joining them back
+            end = -1
+            for _ in range(self.max_output_lines):
+                end = output.find('\n', end + 1)
+            output = output[:max(end, 0)]
+            output += f"\n... (truncated, showing first {self.max_output_lines} lines)"
+        return output, line_count
+
     def execute_command(self, command, working_directory="."):
         """Execute terminal command with security checks and timeout"""
         try:
@@ -52,44 +76,28 @@ class TerminalOperations:
             
             self.logger.info(f"Executing command: {command} in {working_directory}")
             
-            # Execute command with timeout
-            process = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=working_directory,
-                env=os.environ.copy()
-            )
-            
-            # Set timeout (30 seconds default)
+            # Execute command with timeout (30 seconds default); run() kills
+            # the process itself when the timeout expires
             timeout = 30
-            timer = Timer(timeout, process.kill)
-            timer.start()
-            
             try:
-                stdout, stderr = process.communicate()
-                timer.cancel()
-            except:
-                timer.cancel()
-                process.kill()
+                process = subprocess.run(
+                    command,
+                    shell=True,
+                    capture_output=True,
+                    text=True,
+                    cwd=working_directory,
+                    env=os.environ,
+                    timeout=timeout
+                )
+            except subprocess.TimeoutExpired:
                 return {
                     "success": False,
                     "error": f"Command timed out after {timeout} seconds"
                 }
             
             # Limit output lines
-            stdout_lines = stdout.split('\n')
-            stderr_lines = stderr.split('\n')
-            
-            if len(stdout_lines) > self.max_output_lines:
-                stdout = '\n'.join(stdout_lines[:self.max_output_lines])
-                stdout += f"\n... (truncated, showing first {self.max_output_lines} lines)"
-            
-            if len(stderr_lines) > self.max_output_lines:
-                stderr = '\n'.join(stderr_lines[:self.max_output_lines])
-                stderr += f"\n... (truncated, showing first {self.max_output_lines} lines)"
+            stdout, stdout_lines = self._truncate_output(process.stdout)
+            stderr, stderr_lines = self._truncate_output(process.stderr)
             
             return {
                 "success": True,
@@ -98,8 +106,8 @@ class TerminalOperations:
                 "stdout": stdout,
                 "stderr": stderr,
                 "return_code": process.returncode,
-                "stdout_lines": len(stdout_lines),
-                "stderr_lines": len(stderr_lines)
+                "stdout_lines": stdout_lines,
+                "stderr_lines": stderr_lines
             }
             
         except Exception as e:
@@ -109,18 +117,20 @@ class TerminalOperations:
     def get_system_info(self):
         """Get basic system information"""
         try:
+            memory = psutil.virtual_memory()
+            disk = psutil.disk_usage('/')
             return {
                 "success": True,
                 "cpu_count": psutil.cpu_count(),
                 "memory": {
-                    "total": psutil.virtual_memory().total,
-                    "available": psutil.virtual_memory().available,
-                    "percent": psutil.virtual_memory().percent
+                    "total": memory.total,
+                    "available": memory.available,
+                    "percent": memory.percent
                 },
                 "disk": {
-                    "total": psutil.disk_usage('/').total,
-                    "free": psutil.disk_usage('/').free,
-                    "percent": psutil.disk_usage('/').percent
+                    "total": disk.total,
+                    "free": disk.free,
+                    "percent": disk.percent
                 },
                 "load_average": os.getloadavg() if hasattr(os, 'getloadavg') else None
             }
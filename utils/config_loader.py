@@ -6,17 +6,24 @@ import yaml
 import os
 from typing import Any, Dict
 
+# libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 class ConfigLoader:
     def __init__(self, config_path: str = "config.yaml"):
         self.config_path = config_path
         self.config = self._load_config()
+        self._flat = self._flatten(self.config)
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file"""
         try:
             if os.path.exists(self.config_path):
                 with open(self.config_path, 'r') as f:
-                    config = yaml.safe_load(f)
+                    config = yaml.load(f, Loader=_SafeLoader)
                 return config or {}
             else:
                 print(f"Warning: Config file {self.config_path} not found, using defaults")
@@ -25,17 +32,22 @@ class ConfigLoader:
             print(f"Error loading config: {e}")
             return {}
     
+    def _flatten(self, config: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+        """Map every dot-notation key, sections included, to its value"""
+        flat = {}
+        if not isinstance(config, dict):
+            return flat
+        
+        for k, v in config.items():
+            key = f"{prefix}{k}"
+            flat[key] = v
+            if isinstance(v, dict):
+                flat.update(self._flatten(v, f"{key}."))
+        return flat
+    
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value using dot notation"""
-        keys = key.split('.')
-        value = self.config
-        
-        try:
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
-            return default
+        return self._flat.get(key, default)
     
     def set(self, key: str, value: Any) -> None:
         """Set configuration value using dot notation"""
@@ -48,6 +60,7 @@ class ConfigLoader:
             config = config[k]
         
         config[keys[-1]] = value
+        self._flat = self._flatten(self.config)
     
     def save(self) -> None:
         """Save configuration to file"""
@@ -59,4 +72,5 @@ class ConfigLoader:
     
     def reload(self) -> None:
         """Reload configuration from file"""
-        self.config = self._load_config() 
\ No newline at end of file
+        self.config = self._load_config()
+        self._flat = self._flatten(self.config) 
\ No newline at end of file
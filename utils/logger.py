@@ -2,14 +2,20 @@
 Logging configuration for Areeb Model Web
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
 import colorlog
 
+# Background thread writing records to the real handlers
+_listener = None
+
 def setup_logging(config):
     """Setup logging configuration"""
+    global _listener
     
     # Create logs directory
     log_file = config.get('logging.file', 'logs/areeb-model-web.log')
@@ -24,7 +30,10 @@ def setup_logging(config):
     logger = logging.getLogger('areeb-model-web')
     logger.setLevel(log_level)
     
-    # Clear existing handlers
+    # Clear existing handlers, flushing anything still queued for them
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
     logger.handlers.clear()
     
     # Console handler with colors
@@ -42,24 +51,67 @@ def setup_logging(config):
         }
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler with rotation
-    max_size = config.get('logging.max_size_mb', 100) * 1024 * 1024
-    backup_count = config.get('logging.backup_count', 5)
     
-    file_handler = logging.handlers.RotatingFileHandler(
-        log_file,
-        maxBytes=max_size,
-        backupCount=backup_count
-    )
+    # File handler with rotation. Several server workers writing one file
+    # would each rotate it under the others, so with more than one worker
+    # the file is only appended to and rotation is left to logrotate.
+    if config.get('server.workers', 1) > 1:
+        file_handler = logging.handlers.WatchedFileHandler(log_file)
+    else:
+        max_size = config.get('logging.max_size_mb', 100) * 1024 * 1024
+        backup_count = config.get('logging.backup_count', 5)
+        
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=max_size,
+            backupCount=backup_count
+        )
     file_handler.setLevel(log_level)
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+    
+    # Callers only enqueue records; console and file writes happen on the
+    # listener thread so request threads never block on log I/O
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
     
     logger.info("Logging initialized")
-    return logger 
\ No newline at end of file
+    return logger
+
+class PipeLogQueue:
+    """Queue stand-in sending log records, and other messages, over a pipe"""
+    
+    def __init__(self, conn):
+        self._conn = conn
+        # A worker's own threads may log while it sends its result
+        self._lock = threading.Lock()
+    
+    def send(self, message):
+        with self._lock:
+            self._conn.send(message)
+    
+    def put_nowait(self, record):
+        self.send(('log', record))
+
+def setup_worker_logging(conn, log_level):
+    """Send a worker process's log records to the parent over conn"""
+    logger = logging.getLogger('areeb-model-web')
+    logger.setLevel(log_level)
+    logger.handlers.clear()
+    log_queue = PipeLogQueue(conn)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return log_queue
+
+def _stop_listener():
+    """Flush queued records on interpreter exit"""
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_stop_listener) 
\ No newline at end of file